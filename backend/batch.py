@@ -0,0 +1,259 @@
+"""Headless batch trajectory analysis over an archive of clips.
+
+Clips come from directories (searched recursively for video files) or manifest files
+(one path per line, or JSONL with a "path" field). They are sharded across a process
+pool whose workers each load the model once. Every clip's trajectory is written to
+<out>/trajectories/<clip id>.jsonl (or .parquet), and a summary line with metrics and
+timings is appended to <out>/results.jsonl as soon as the clip finishes. Re-running
+with the same --out skips clips already recorded there, so an interrupted run resumes.
+With --segment-seconds, long clips are split into keyframe-aligned segments that are
+tracked by separate workers and stitched back together, so a single full game also
+uses every worker.
+
+Usage:
+    python batch.py /data/games --out ./batch_out --workers 4
+    python batch.py manifest.txt --out ./batch_out --format parquet --kalman
+    python batch.py full_game.mp4 --out ./batch_out --segment-seconds 60
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict
+from pathlib import Path
+
+from main import (AnalysisOptions, DEFAULT_MODEL_PATH, BATCH_SIZE, INFERENCE_ENGINE, TrajectoryBuffer,
+                  build_tracker, merge_segment_timings, model_registry, plan_segments, stitch_segments,
+                  track_segment)
+
+VIDEO_SUFFIXES = {".mp4", ".mov", ".mkv", ".avi", ".m4v", ".webm", ".mpg", ".mpeg", ".ts"}
+
+
+def collect_clips(inputs: list) -> list:
+    """Video paths from directories and manifest files, deduplicated, in a stable order"""
+    clips = []
+    for entry in inputs:
+        path = Path(entry)
+        if path.is_dir():
+            clips.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() in VIDEO_SUFFIXES))
+        elif path.suffix.lower() in VIDEO_SUFFIXES:
+            clips.append(path)
+        else:
+            for line in path.read_text().splitlines():
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                clip = Path(json.loads(line)["path"] if line.startswith("{") else line)
+                clips.append(clip if clip.is_absolute() else path.parent / clip)
+
+    seen = set()
+    unique = []
+    for clip in clips:
+        resolved = clip.resolve()
+        if resolved not in seen:
+            seen.add(resolved)
+            unique.append(resolved)
+    return unique
+
+
+def clip_id(clip: Path) -> str:
+    """Stable, filesystem-safe id for a clip path"""
+    return f"{clip.stem}-{hashlib.sha1(str(clip).encode()).hexdigest()[:10]}"
+
+
+def load_done(results_path: Path) -> set:
+    """Ids of clips already recorded successfully by an earlier run"""
+    done = set()
+    if results_path.exists():
+        for line in results_path.read_text().splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line torn by a crash mid-write
+            if record.get("status") == "ok":
+                done.add(record["clip_id"])
+    return done
+
+
+def write_trajectory(trajectory: TrajectoryBuffer, path: Path, fmt: str):
+    """Write trajectory rows atomically, so a crash never leaves a partial file behind"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    columns = {name: trajectory.data[:, i].tolist() for i, name in enumerate(TrajectoryBuffer.COLUMNS)}
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.table(columns), tmp_path)
+    else:
+        with open(tmp_path, "w") as f:
+            for row in zip(*columns.values()):
+                f.write(json.dumps(dict(zip(columns, row))) + "\n")
+    os.replace(tmp_path, path)
+
+
+def _init_worker(model_path: str, engine: str):
+    # Each worker process loads and warms the model once for all of its clips
+    model_registry.get(model_path, engine)
+
+
+def _record_result(record: dict, tracker, timings: dict, out_dir: str, fmt: str):
+    trajectory_path = Path(out_dir) / "trajectories" / f"{record['clip_id']}.{fmt}"
+    write_trajectory(tracker.trajectory, trajectory_path, fmt)
+    record.update(
+        status="ok",
+        frames=timings["frames"],
+        points=len(tracker.trajectory),
+        metrics={key: float(value) for key, value in tracker.calculate_pitch_metrics().items()},
+        timings=timings,
+        trajectory=str(trajectory_path),
+    )
+    if tracker.track_manager is not None:
+        # Event tracks can be long over a whole game; the summary keeps their timing and metrics
+        record["events"] = [{k: v for k, v in event.items() if k != "trajectory"}
+                            for event in tracker.track_manager.events()]
+
+
+def analyze_clip(clip: str, out_dir: str, model_path: str, batch_size: int,
+                 options: AnalysisOptions, fmt: str) -> dict:
+    """Track one clip headlessly and write its trajectory; runs in a worker process"""
+    record = {"clip_id": clip_id(Path(clip)), "path": clip}
+    start = time.perf_counter()
+    try:
+        tracker = build_tracker(clip, model_path, options)
+        if not tracker.cap.isOpened() or tracker.fps <= 0:
+            raise ValueError("Could not open video")
+        timings = tracker.track(max_seconds=options.max_seconds, batch_size=batch_size)
+        _record_result(record, tracker, timings, out_dir, fmt)
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}", frames=0)
+    record["seconds"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def stitch_clip(clip: str, out_dir: str, model_path: str, options: AnalysisOptions, fmt: str,
+                segments: list, error: str = None) -> dict:
+    """Stitch a segmented clip's tracked segments and write its trajectory; runs in a worker process"""
+    record = {"clip_id": clip_id(Path(clip)), "path": clip}
+    try:
+        if error is not None:
+            raise RuntimeError(f"segment failed: {error}")
+        tracker = stitch_segments(clip, model_path, options, segments)
+        _record_result(record, tracker, merge_segment_timings(segments), out_dir, fmt)
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}", frames=0)
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="directories, video files or manifest files")
+    parser.add_argument("--out", default="./batch_out")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--max-seconds", type=float, default=math.inf,
+                        help="analyse only the start of each clip (default: whole clip)")
+    parser.add_argument("--confidence", type=float, default=0.5)
+    parser.add_argument("--motion-gate", action="store_true")
+    parser.add_argument("--kalman", action="store_true")
+    parser.add_argument("--imgsz", type=int, help="downscale frames to this long side before detection")
+    parser.add_argument("--letterbox", action="store_true", help="pad downscaled frames to a square input")
+    parser.add_argument("--engine", choices=["torch", "onnx", "onnx-int8"], default=INFERENCE_ENGINE,
+                        help="detector runtime (the onnx engines export --model on first use)")
+    parser.add_argument("--events", action="store_true",
+                        help="track every ball and record per-pitch and batted-ball event metrics")
+    parser.add_argument("--segment-seconds", type=float,
+                        help="split clips longer than this into segments tracked by separate workers")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    args = parser.parse_args()
+
+    if args.format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("--format parquet requires pyarrow")
+
+    out_dir = Path(args.out)
+    (out_dir / "trajectories").mkdir(parents=True, exist_ok=True)
+    results_path = out_dir / "results.jsonl"
+
+    clips = collect_clips(args.inputs)
+    done = load_done(results_path)
+    pending = [clip for clip in clips if clip_id(clip) not in done]
+    print(f"{len(clips)} clips, {len(clips) - len(pending)} already done, {len(pending)} to analyse")
+    if not pending:
+        return
+
+    options = AnalysisOptions(max_seconds=args.max_seconds, confidence=args.confidence,
+                              motion_gate=args.motion_gate, kalman=args.kalman,
+                              segment_seconds=args.segment_seconds, imgsz=args.imgsz, letterbox=args.letterbox,
+                              events=args.events, engine=args.engine)
+    start = time.perf_counter()
+    total_frames = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.model, args.engine)) as pool, open(results_path, "a") as results:
+        futures = {}  # future -> clip for a segment of a segmented clip, None for a finished record
+        segments = {}  # segmented clip -> tracked segments so far
+        remaining = {}  # segmented clip -> segments still running
+        errors = {}
+        started = {}
+        for clip in pending:
+            started[clip] = time.perf_counter()
+            plan = None
+            if args.segment_seconds:
+                try:
+                    plan = plan_segments(str(clip), args.segment_seconds, args.max_seconds)
+                except Exception:
+                    plan = None  # analyze_clip records why the clip can't be read
+            if plan is not None and len(plan) > 1:
+                segments[clip], remaining[clip] = [], len(plan)
+                for start_frame, end_frame in plan:
+                    futures[pool.submit(track_segment, str(clip), args.model, args.batch_size, options,
+                                        start_frame, end_frame)] = clip
+            else:
+                futures[pool.submit(analyze_clip, str(clip), str(out_dir), args.model, args.batch_size,
+                                    options, args.format)] = None
+        
+        finished = 0
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                clip = futures.pop(future)
+                if clip is not None:
+                    # Stitch a segmented clip once all of its segments are in
+                    try:
+                        segments[clip].append(future.result())
+                    except Exception as e:
+                        errors[clip] = f"{type(e).__name__}: {e}"
+                    remaining[clip] -= 1
+                    if remaining[clip] == 0:
+                        futures[pool.submit(stitch_clip, str(clip), str(out_dir), args.model, options,
+                                            args.format, segments.pop(clip), errors.pop(clip, None))] = None
+                    continue
+                
+                record = future.result()
+                # Segmented clips are timed from submitting their first segment to the stitch
+                record.setdefault("seconds", round(time.perf_counter() - started[Path(record["path"])], 4))
+                record["options"] = {k: v for k, v in asdict(options).items() if v not in (math.inf, None)}
+                results.write(json.dumps(record) + "\n")
+                results.flush()
+                os.fsync(results.fileno())
+                
+                finished += 1
+                total_frames += record["frames"]
+                failed += record["status"] != "ok"
+                elapsed = time.perf_counter() - start
+                print(f"[{finished}/{len(pending)}] {record['status']:5} {record['path']} "
+                      f"({record['frames']} frames, {record['seconds']:.1f}s) | "
+                      f"{finished / elapsed:.2f} clips/s, {total_frames / elapsed:.1f} frames/s")
+
+    elapsed = time.perf_counter() - start
+    print(f"Analysed {len(pending)} clips ({failed} failed), {total_frames} frames in {elapsed:.1f}s: "
+          f"{len(pending) / elapsed:.2f} clips/s, {total_frames / elapsed:.1f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
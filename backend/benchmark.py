@@ -0,0 +1,211 @@
+"""Benchmark per-frame vs batched YOLO inference, annotation cost and motion gating for BaseballTracker.
+
+Usage:
+    python benchmark.py clip.mp4 --model ./models/best.pt --batch-sizes 1 4 8 16
+    python benchmark.py clip.mp4 --max-seconds 10 --annotation
+    python benchmark.py clips/*.mp4 --motion-gate
+    python benchmark.py clip.mp4 --payload
+    python benchmark.py clip.mp4 --gemini
+    python benchmark.py clip.mp4 --engines torch onnx onnx-int8
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from main import (BaseballTracker, DEFAULT_MODEL_PATH, MotionGate, analysis_result, extract_frames,
+                  model_registry, select_frames, trajectory_response)
+
+
+def run_per_frame(model_path: str, video_path: str, max_seconds: float, annotate: bool = True) -> dict:
+    """Original path: one YOLO call per decoded frame"""
+    tracker = BaseballTracker(model_path=model_path, video_path=video_path, annotate=annotate)
+    frame_count = 0
+    start = time.perf_counter()
+    while tracker.cap.isOpened():
+        ret, frame = tracker.cap.read()
+        if not ret:
+            break
+        timestamp = frame_count / tracker.fps
+        tracker.process_frame(frame, timestamp)
+        frame_count += 1
+        if timestamp >= max_seconds:
+            break
+    elapsed = time.perf_counter() - start
+    tracker.cap.release()
+    return {"mode": "per_frame" if annotate else "per_frame_headless", "frames": frame_count, "seconds": elapsed,
+            "fps": frame_count / elapsed if elapsed else 0.0,
+            "points": len(tracker.trajectory_points)}
+
+
+def run_batched(model_path: str, video_path: str, max_seconds: float, batch_size: int) -> dict:
+    """Batched path: batch_size frames per YOLO call"""
+    tracker = BaseballTracker(model_path=model_path, video_path=video_path)
+    frame_count = 0
+    start = time.perf_counter()
+    for frames, timestamps in tracker.read_batches(batch_size, max_seconds):
+        tracker.process_batch(frames, timestamps)
+        frame_count += len(frames)
+    elapsed = time.perf_counter() - start
+    tracker.cap.release()
+    return {"mode": f"batch_{batch_size}", "frames": frame_count, "seconds": elapsed,
+            "fps": frame_count / elapsed if elapsed else 0.0,
+            "points": len(tracker.trajectory_points)}
+
+
+def run_motion_gate(model_path: str, video_path: str, max_seconds: float, batch_size: int) -> dict:
+    """YOLO images saved by MotionGate, and recall of detected frames against ungated tracking"""
+    reference = BaseballTracker(model_path=model_path, video_path=video_path, annotate=False)
+    reference.track(max_seconds=max_seconds, batch_size=batch_size)
+    
+    gate = MotionGate()
+    gated = BaseballTracker(model_path=model_path, video_path=video_path, annotate=False, motion_gate=gate)
+    timings = gated.track(max_seconds=max_seconds, batch_size=batch_size)
+    
+    reference_frames = set(reference.trajectory.frame_index.astype(int).tolist())
+    gated_frames = set(gated.trajectory.frame_index.astype(int).tolist())
+    recall = len(reference_frames & gated_frames) / len(reference_frames) if reference_frames else 1.0
+    return {"mode": "motion_gate", "frames": gate.stats["frames"], "seconds": timings["wall_seconds"],
+            "fps": timings["fps"], "points": len(gated.trajectory),
+            "yolo_full": gate.stats["full"], "yolo_roi": gate.stats["roi"], "yolo_skipped": gate.stats["skipped"],
+            "reference_points": len(reference.trajectory), "recall": recall}
+
+
+def run_payload(model_path: str, video_path: str, max_seconds: float, batch_size: int,
+                repeats: int = 5) -> list:
+    """Response bytes and server-side build + serialize time for each plot format"""
+    tracker = BaseballTracker(model_path=model_path, video_path=video_path, annotate=False)
+    timings = tracker.track(max_seconds=max_seconds, batch_size=batch_size)
+    runs = []
+    for plot_format in ("plotly", "compact", "binary"):
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            response = trajectory_response(analysis_result(tracker, timings, plot_format), plot_format)
+            # Render the way FastAPI does for a response_model endpoint
+            body = response.body if plot_format == "binary" else JSONResponse(jsonable_encoder(response)).body
+            best = min(best, time.perf_counter() - start)
+        runs.append({"mode": f"payload_{plot_format}", "points": len(tracker.trajectory),
+                     "bytes": len(body), "serialize_ms": best * 1000})
+    return runs
+
+
+def run_frame_selection(model_path: str, video_path: str) -> list:
+    """Bytes /gemini-analyse would send with the fixed timestamps vs adaptive keyframe selection"""
+    runs = []
+    for mode, select in (("gemini_fixed", lambda: extract_frames(video_path, [4, 5, 8, 11, 15, 20])),
+                         ("gemini_adaptive", lambda: select_frames(video_path, model_path))):
+        start = time.perf_counter()
+        frames = [jpeg for jpeg in select().values() if jpeg is not None]
+        runs.append({"mode": mode, "frames_sent": len(frames), "bytes": sum(map(len, frames)),
+                     "seconds": time.perf_counter() - start})
+    return runs
+
+
+def run_engines(model_path: str, video_path: str, max_seconds: float, batch_size: int, engines: list) -> list:
+    """Inference latency of each detector runtime, and its detections scored against the PyTorch ones"""
+    detections = {}
+    runs = []
+    for engine in engines:
+        model_registry.get(model_path, engine)  # export and warm up outside the timing
+        tracker = BaseballTracker(model_path=model_path, video_path=video_path, annotate=False, engine=engine)
+        tracker.candidate_log = {}
+        timings = tracker.track(max_seconds=max_seconds, batch_size=batch_size)
+        detections[engine] = tracker.candidate_log
+        runs.append({"mode": f"engine_{engine}", "frames": timings["frames"], "fps": timings["fps"],
+                     "inference_ms_per_frame": timings["inference_seconds"] / max(timings["frames"], 1) * 1000,
+                     "points": sum(map(len, tracker.candidate_log.values()))})
+    
+    reference = detections.get("torch")
+    for run in runs:
+        if reference is None:
+            break
+        engine = run["mode"][len("engine_"):]
+        matched, errors, confidence_deltas = 0, [], []
+        for frame_index, expected in reference.items():
+            found = detections[engine].get(frame_index, [])
+            for x, y, confidence in expected:
+                distances = [np.hypot(x - fx, y - fy) for fx, fy, _ in found]
+                if distances and min(distances) <= 10:
+                    nearest = found[int(np.argmin(distances))]
+                    matched += 1
+                    errors.append(min(distances))
+                    confidence_deltas.append(abs(confidence - nearest[2]))
+        expected_count = sum(map(len, reference.values()))
+        run.update(recall=matched / expected_count if expected_count else 1.0,
+                   precision=matched / run["points"] if run["points"] else 1.0,
+                   mean_error_px=float(np.mean(errors)) if errors else 0.0,
+                   mean_confidence_delta=float(np.mean(confidence_deltas)) if confidence_deltas else 0.0)
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--max-seconds", type=float, default=6.0)
+    parser.add_argument("--annotation", action="store_true",
+                        help="also time the per-frame path with annotation disabled")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="also report YOLO calls saved and detection recall with MotionGate")
+    parser.add_argument("--payload", action="store_true",
+                        help="also compare response bytes and serialize time of the plot formats")
+    parser.add_argument("--gemini", action="store_true",
+                        help="also compare bytes sent to Gemini with fixed vs adaptive frame selection")
+    parser.add_argument("--engines", nargs="+", choices=["torch", "onnx", "onnx-int8"],
+                        help="also compare inference latency and detections of these runtimes (vs torch)")
+    args = parser.parse_args()
+
+    # Load once up front so model loading isn't counted against the first run
+    model_registry.get(args.model)
+
+    results = []
+    for video in args.videos:
+        runs = [run_per_frame(args.model, video, args.max_seconds)]
+        if args.annotation:
+            runs.append(run_per_frame(args.model, video, args.max_seconds, annotate=False))
+        for batch_size in args.batch_sizes:
+            runs.append(run_batched(args.model, video, args.max_seconds, batch_size))
+        if args.motion_gate:
+            runs.append(run_motion_gate(args.model, video, args.max_seconds, max(args.batch_sizes)))
+        payload_runs = run_payload(args.model, video, args.max_seconds, max(args.batch_sizes)) if args.payload else []
+        gemini_runs = run_frame_selection(args.model, video) if args.gemini else []
+        engine_runs = (run_engines(args.model, video, args.max_seconds, max(args.batch_sizes), args.engines)
+                       if args.engines else [])
+        
+        print(video)
+        for result in payload_runs:
+            print(f"{result['mode']:>18}: {result['bytes']:8d} bytes, {result['serialize_ms']:7.2f} ms "
+                  f"({result['points']} points)")
+            result["video"] = video
+        for result in gemini_runs:
+            print(f"{result['mode']:>18}: {result['bytes']:8d} bytes in {result['frames_sent']} frames, "
+                  f"selected in {result['seconds']:.2f}s")
+            result["video"] = video
+        for result in engine_runs:
+            line = (f"{result['mode']:>18}: {result['fps']:8.1f} frames/s, "
+                    f"{result['inference_ms_per_frame']:6.2f} ms/frame inference")
+            if "recall" in result:
+                line += (f", recall {result['recall']:.3f}, precision {result['precision']:.3f}, "
+                         f"error {result['mean_error_px']:.2f} px, conf delta {result['mean_confidence_delta']:.3f}")
+            print(line)
+            result["video"] = video
+        for result in runs:
+            line = (f"{result['mode']:>18}: {result['fps']:8.1f} frames/s "
+                    f"({result['frames']} frames, {result['points']} points)")
+            if result["mode"] == "motion_gate":
+                line += (f", YOLO full/roi/skipped {result['yolo_full']}/{result['yolo_roi']}/"
+                         f"{result['yolo_skipped']}, recall {result['recall']:.3f}")
+            print(line)
+            result["video"] = video
+        results.extend(runs + payload_runs + gemini_runs + engine_runs)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Offline performance baseline for the tracking pipeline's hot paths.
+
+Generates synthetic pitch clips with OpenCV (a ball flying over a textured field, at several
+resolutions and lengths) and runs the pipeline with a stub detector in place of YOLO, so no
+weights or GPU are needed. Times decode (raw OpenCV and each available decode backend), process_frame, batched track(), the pitch metrics,
+generate_3d_plot and full /trajectory-3d requests through a TestClient, and writes frames/s,
+p50/p95 latency and peak RSS to JSON. Comparing against an earlier run's JSON flags regressions.
+Tracking is also repeated at each --inference-sizes, with and without letterboxing, for a
+speed/accuracy table: frames/s against recall and pixel error vs native-resolution detection.
+
+Usage:
+    python benchmark_suite.py --out bench.json
+    python benchmark_suite.py --resolutions 1280x720 --seconds 4 --out new.json --baseline bench.json
+    python benchmark_suite.py --resolutions 1920x1080 --inference-sizes 320 640 960
+"""
+import argparse
+import json
+import platform
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main as backend
+from main import (AnalysisOptions, BaseballTracker, DetectionBox, DetectionResult, ResultCache, build_tracker,
+                  generate_3d_plot, model_registry, open_video, video_decoders)
+
+STUB_MODEL_PATH = "stub-detector"
+
+
+class StubDetector:
+    """Stands in for YOLO: reports bright blobs (the synthetic ball) as detections"""
+    def __init__(self, threshold: int = 240, min_area: int = 4):
+        self.threshold = threshold
+        self.min_area = min_area
+
+    def _detect(self, frame: np.ndarray) -> DetectionResult:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(gray, self.threshold, 255, cv2.THRESH_BINARY)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        return DetectionResult([DetectionBox([x, y, x + w, y + h], 0.9) for x, y, w, h, area in stats[1:count]
+                                if area >= self.min_area])
+
+    def __call__(self, source, verbose: bool = True, **kwargs):
+        frames = source if isinstance(source, list) else [source]
+        return [self._detect(frame) for frame in frames]
+
+
+def make_clip(path: Path, width: int, height: int, seconds: float, fps: int = 30, pitch_seconds: float = 1.0) -> Path:
+    """Write a clip of repeated pitches: a white ball on a parabola over a noisy green field"""
+    rng = np.random.default_rng(0)
+    field = np.empty((height, width, 3), dtype=np.uint8)
+    field[:] = (40, 110, 50)
+    field = cv2.add(field, rng.integers(0, 30, (height, width, 3), dtype=np.uint8))
+    cv2.rectangle(field, (int(width * 0.85), int(height * 0.55)), (int(width * 0.9), int(height * 0.7)),
+                  (200, 200, 200), -1)  # plate-side clutter below the ball's brightness threshold
+
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    radius = max(2, width // 160)
+    for i in range(int(seconds * fps)):
+        frame = field.copy()
+        phase = (i / fps) % (pitch_seconds * 1.5) / pitch_seconds
+        if phase <= 1.0:  # the last third of each cycle has no ball in flight
+            x = width * (0.1 + 0.75 * phase)
+            y = height * (0.35 + 0.25 * phase ** 2)
+            cv2.circle(frame, (int(x), int(y)), radius, (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def _summary(stage: str, latencies: list, frames: int = None, seconds: float = None) -> dict:
+    latencies_ms = np.asarray(latencies) * 1000
+    result = {"stage": stage, "samples": len(latencies),
+              "p50_ms": float(np.percentile(latencies_ms, 50)) if len(latencies) else None,
+              "p95_ms": float(np.percentile(latencies_ms, 95)) if len(latencies) else None}
+    if frames is not None:
+        seconds = seconds if seconds is not None else float(np.sum(latencies))
+        result.update(frames=frames, fps=frames / seconds if seconds else 0.0)
+    result["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+    return result
+
+
+def bench_decode(clip: Path, backend: str = None) -> dict:
+    """Per-frame read latency of a default cv2.VideoCapture, or of one of the pipeline's decode backends"""
+    cap = cv2.VideoCapture(str(clip)) if backend is None else open_video(str(clip), backend)
+    latencies = []
+    while True:
+        start = time.perf_counter()
+        ret, _ = cap.read()
+        if not ret:
+            break
+        latencies.append(time.perf_counter() - start)
+    cap.release()
+    return _summary("decode" if backend is None else f"decode_{backend}", latencies, frames=len(latencies))
+
+
+def bench_process_frame(clip: Path) -> dict:
+    """The per-frame path with annotation, as analyze_video drives it (decode excluded)"""
+    tracker = BaseballTracker(STUB_MODEL_PATH, str(clip))
+    latencies = []
+    frame_index = 0
+    while True:
+        ret, frame = tracker.cap.read()
+        if not ret:
+            break
+        start = time.perf_counter()
+        tracker.process_frame(frame, frame_index / tracker.fps)
+        latencies.append(time.perf_counter() - start)
+        frame_index += 1
+    tracker.cap.release()
+    return _summary("process_frame", latencies, frames=len(latencies))
+
+
+def bench_track(clip: Path, batch_size: int) -> tuple:
+    """Headless batched tracking with decode overlapped; returns the tracker for later stages"""
+    tracker = build_tracker(str(clip), STUB_MODEL_PATH, AnalysisOptions())
+    timings = tracker.track(max_seconds=float("inf"), batch_size=batch_size)
+    result = _summary(f"track_batch_{batch_size}", [], frames=timings["frames"], seconds=timings["wall_seconds"])
+    result["points"] = len(tracker.trajectory)
+    return result, tracker
+
+
+def bench_inference_size(clip: Path, batch_size: int, reference: BaseballTracker,
+                         imgsz: int, letterbox: bool) -> dict:
+    """Tracking with frames downscaled to imgsz, scored against the native-resolution track"""
+    tracker = build_tracker(str(clip), STUB_MODEL_PATH, AnalysisOptions(imgsz=imgsz, letterbox=letterbox))
+    timings = tracker.track(max_seconds=float("inf"), batch_size=batch_size)
+    result = _summary(f"track_imgsz_{imgsz}{'_letterbox' if letterbox else ''}", [],
+                      frames=timings["frames"], seconds=timings["wall_seconds"])
+    
+    native = dict(zip(reference.trajectory.frame_index.astype(int), reference.trajectory_points))
+    resized = dict(zip(tracker.trajectory.frame_index.astype(int), tracker.trajectory_points))
+    matched = sorted(native.keys() & resized.keys())
+    errors = np.array([np.hypot(*(resized[i] - native[i])) for i in matched])
+    result.update(points=len(tracker.trajectory),
+                  recall=len(matched) / len(native) if native else 1.0,
+                  mean_error_px=float(errors.mean()) if len(errors) else None,
+                  max_error_px=float(errors.max()) if len(errors) else None)
+    return result
+
+
+def bench_metrics(tracker: BaseballTracker, repeats: int) -> dict:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        tracker.calculate_pitch_metrics()
+        latencies.append(time.perf_counter() - start)
+    return _summary("pitch_metrics", latencies)
+
+
+def bench_plot(tracker: BaseballTracker, repeats: int) -> dict:
+    generate_3d_plot(tracker)  # the first call builds the cached figure template
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        generate_3d_plot(tracker)
+        latencies.append(time.perf_counter() - start)
+    return _summary("generate_3d_plot", latencies)
+
+
+def bench_endpoint(client: TestClient, clip: Path, repeats: int, cached: bool) -> dict:
+    """Full /trajectory-3d requests: upload, analysis and response serialization"""
+    data = clip.read_bytes()
+    params = {"model_path": STUB_MODEL_PATH, "max_seconds": 1e9}
+    if cached:
+        client.post("/trajectory-3d", params=params, files={"video": (clip.name, data)}).raise_for_status()
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = client.post("/trajectory-3d", params=params, files={"video": (clip.name, data)})
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+        if response.json()["cached"] != cached:
+            raise RuntimeError("unexpected result cache state")
+    return _summary("trajectory_3d_cached" if cached else "trajectory_3d", latencies)
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Stages whose fps fell or p95 latency rose by more than tolerance (a fraction) vs the baseline"""
+    previous = {(r["clip"], r["stage"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["clip"], result["stage"]))
+        if before is None:
+            continue
+        if before.get("fps") and result.get("fps") is not None and result["fps"] < before["fps"] * (1 - tolerance):
+            regressions.append(f"{result['clip']} {result['stage']}: {before['fps']:.1f} -> {result['fps']:.1f} frames/s")
+        if before.get("p95_ms") and result.get("p95_ms") is not None and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{result['clip']} {result['stage']}: p95 {before['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resolutions", nargs="+", default=["640x360", "1280x720", "1920x1080"])
+    parser.add_argument("--seconds", type=float, nargs="+", default=[2.0, 6.0], help="clip lengths")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=backend.BATCH_SIZE)
+    parser.add_argument("--repeats", type=int, default=20, help="repetitions of the plot and metrics stages")
+    parser.add_argument("--requests", type=int, default=5, help="/trajectory-3d requests per clip")
+    parser.add_argument("--inference-sizes", type=int, nargs="*", default=[320, 640, 960],
+                        help="downscaled inference sizes to compare against native resolution")
+    parser.add_argument("--out", default="benchmark_suite.json")
+    parser.add_argument("--baseline", help="earlier --out file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs the baseline")
+    args = parser.parse_args()
+
+    model_registry.register(STUB_MODEL_PATH, StubDetector())
+    cached_results = ResultCache(disk_dir=None)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="flash-bench-") as tmp, TestClient(backend.app) as client:
+        for resolution in args.resolutions:
+            width, height = map(int, resolution.split("x"))
+            for seconds in args.seconds:
+                name = f"{resolution}_{seconds:g}s"
+                clip = make_clip(Path(tmp) / f"{name}.mp4", width, height, seconds, args.fps)
+
+                track_result, tracker = bench_track(clip, args.batch_size)
+                stages = [bench_decode(clip)] + [bench_decode(clip, backend) for backend in video_decoders.available()]
+                stages += [bench_process_frame(clip), track_result,
+                          bench_metrics(tracker, args.repeats * 50), bench_plot(tracker, args.repeats)]
+                stages += [bench_inference_size(clip, args.batch_size, tracker, imgsz, letterbox)
+                           for imgsz in args.inference_sizes if imgsz < max(width, height)
+                           for letterbox in (False, True)]
+                # A cache too small to hold anything, so every request runs the analysis
+                backend.result_cache = ResultCache(max_bytes=0, disk_dir=None)
+                stages.append(bench_endpoint(client, clip, args.requests, cached=False))
+                backend.result_cache = cached_results
+                stages.append(bench_endpoint(client, clip, args.requests, cached=True))
+
+                for stage in stages:
+                    stage.update(clip=name, width=width, height=height, seconds=seconds)
+                    fps = f"{stage['fps']:9.1f} frames/s" if "fps" in stage else " " * 18
+                    p50 = f"p50 {stage['p50_ms']:8.3f} ms  p95 {stage['p95_ms']:8.3f} ms" if stage["samples"] else ""
+                    accuracy = (f"  recall {stage['recall']:.3f}  error {stage['mean_error_px'] or 0:.2f} px"
+                                if "recall" in stage else "")
+                    print(f"{name:>16} {stage['stage']:>22}: {fps}  {p50}  rss {stage['peak_rss_mb']:.0f} MB{accuracy}")
+                results.extend(stages)
+
+    report = {
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "opencv": cv2.__version__, "numpy": np.__version__,
+                        "cpus": cv2.getNumberOfCPUs(), "batch_size": args.batch_size},
+        "results": results,
+    }
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"Wrote {args.out}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text())["results"], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,11 +17,12 @@ const app = express();
 app.use(express.json());
 app.use(cors());
 
-// Convert file to GenerativeAI part
-function fileToGenerativePart(filePath, mimeType) {
+// Convert file to GenerativeAI part without blocking the event loop
+async function fileToGenerativePart(filePath, mimeType) {
+  const data = await fs.promises.readFile(filePath);
   return {
     inlineData: {
-      data: Buffer.from(fs.readFileSync(filePath)).toString("base64"),
+      data: data.toString("base64"),
       mimeType,
     },
   };
@@ -69,14 +70,14 @@ app.post('/analyze-video', async (req, res) => {
 
     // Step 2: Prepare frames for model input
     console.log("Preparing frames for model input...");
-    const imageParts = framePaths.map((filePath) => {
+    const imageParts = await Promise.all(framePaths.map(async (filePath) => {
       try {
-        return fileToGenerativePart(filePath, "image/jpg");
+        return await fileToGenerativePart(filePath, "image/jpg");
       } catch (error) {
         console.error(`Error processing image: ${filePath}`, error);
         throw new Error('Error processing images');
       }
-    });
+    }));
 
     // Step 3: Send to Generative AI
     console.log("Sending request to model...");
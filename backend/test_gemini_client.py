@@ -0,0 +1,92 @@
+"""GeminiClient retries, errors and request coalescing, driven through httpx.MockTransport.
+
+Usage:
+    python -m pytest test_gemini_client.py
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from main import GeminiClient
+
+REPLY = {"candidates": [{"content": {"parts": [{"text": "92 mph fastball"}]}}],
+         "usageMetadata": {"totalTokenCount": 12}}
+
+
+def make_client(handler, backoff_seconds: float = 0.0) -> GeminiClient:
+    return GeminiClient(api_key="test", base_url="http://gemini.test", backoff_seconds=backoff_seconds,
+                        transport=httpx.MockTransport(handler))
+
+
+def test_retries_503_then_succeeds():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(503, headers={"Retry-After": "0"})
+        return httpx.Response(200, json=REPLY)
+
+    async def run():
+        # A backoff this long would time the test out unless Retry-After: 0 overrides it
+        client = make_client(handler, backoff_seconds=60.0)
+        try:
+            return client, await asyncio.wait_for(client.generate("pitch speed?", [b"jpeg"]), timeout=5)
+        finally:
+            await client.aclose()
+
+    client, result = asyncio.run(run())
+    assert result == {"text": "92 mph fastball", "model": client.model,
+                      "usage": {"totalTokenCount": 12}, "cached": False}
+    assert len(requests) == 2
+    assert requests[1].headers["x-goog-api-key"] == "test"
+    assert client.stats["retries"] == 1
+
+
+def test_400_raises_without_retrying():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(400, json={"error": {"message": "bad request"}})
+
+    async def run():
+        client = make_client(handler)
+        try:
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.generate("pitch speed?", [b"jpeg"])
+            return client
+        finally:
+            await client.aclose()
+
+    client = asyncio.run(run())
+    assert len(requests) == 1
+    assert client.stats["errors"] == 1
+    assert client.status()["in_flight"] == 0
+
+
+def test_concurrent_identical_calls_share_one_request():
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await asyncio.sleep(0.05)  # keep the first call in flight while the second arrives
+        return httpx.Response(200, json=REPLY)
+
+    async def run():
+        client = make_client(handler)
+        try:
+            first, second = await asyncio.gather(client.generate("pitch speed?", [b"jpeg"]),
+                                                 client.generate("pitch speed?", [b"jpeg"]))
+            third = await client.generate("pitch speed?", [b"jpeg"])
+            return client, first, second, third
+        finally:
+            await client.aclose()
+
+    client, first, second, third = asyncio.run(run())
+    assert len(requests) == 1
+    assert first["text"] == second["text"] == third["text"] == "92 mph fastball"
+    assert (first["cached"], second["cached"], third["cached"]) == (False, True, True)
+    assert client.stats["coalesced"] == 1
+    assert client.stats["cache_hits"] == 1